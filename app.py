@@ -3,6 +3,7 @@ import streamlit.components.v1 as components
 import front6
 import visualizations
 import csv_utils
+import metrics
 
 # Set the page config FIRST
 st.set_page_config(page_title="Online Payment Fraud Detection System", layout="wide")
@@ -63,6 +64,8 @@ if st.sidebar.button("Visualization"):
     st.session_state.page = 'Visualizations'
 if st.sidebar.button("Model Details"):
     st.session_state.page = 'model_details'
+if st.sidebar.button("Drift Monitor"):
+    st.session_state.page = 'drift_monitor'
 
 st.sidebar.subheader("Application")
 if st.sidebar.button("About"):
@@ -218,6 +221,29 @@ elif st.session_state.page == 'model_details':
         "- **Model File:** Saved as 'rf_model3.pkl' using joblib for deployment."
     )
     
+elif st.session_state.page == 'drift_monitor':
+    st.title("📈 Feature Drift Monitor")
+    st.markdown(
+        "Compares the transactions recently scored in this app with the distributions `rf_model3.pkl` was trained on. "
+        "A PSI below 0.1 is stable, 0.1-0.25 is a moderate shift and above 0.25 is a significant shift."
+    )
+
+    if front6.drift_monitor is None:
+        st.info("No reference histograms found for 'rf_model3.pkl'. Re-create the model with create_mock_model.py or tune_model.py to enable drift monitoring.")
+    else:
+        drift_stats = front6.drift_monitor.stats()
+        if drift_stats['window_rows'].iloc[0] == 0:
+            st.info("No transactions scored yet. Check transactions under Getting Started or Bulk Upload.")
+        elif drift_stats['status'].iloc[0] == 'insufficient data':
+            st.info(f"Only {drift_stats['window_rows'].iloc[0]} transaction(s) scored so far. PSI and KS are reported "
+                    f"once {front6.drift_monitor.min_rows} have been scored, since smaller samples look like drift by chance.")
+        else:
+            st.dataframe(drift_stats, use_container_width=True)
+            st.bar_chart(drift_stats.set_index('feature')['psi'])
+
+    st.subheader("Metrics")
+    st.code(metrics.format_metrics() or "No metrics recorded yet.")
+
 elif st.session_state.page == 'About':    
     st.subheader("Welcome to the Online Payment Fraud Detection and Prevention App!")
     st.markdown(
@@ -8,13 +8,11 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 
-def create_mock_model():
-    """Create a simple mock Random Forest model for testing"""
-    print("🤖 Creating mock Random Forest model...")
-    
-    # Generate mock training data
-    np.random.seed(42)
-    n_samples = 1000
+import drift
+
+def generate_mock_data(n_samples=1000, seed=42):
+    """Generate synthetic transactions and rule-based fraud labels as (X, y)"""
+    np.random.seed(seed)
     
     # Create synthetic transaction data
     step = np.random.randint(1, 100, n_samples)
@@ -56,6 +54,15 @@ def create_mock_model():
         if fraud_score >= 2:
             y[i] = 1
     
+    return X, y
+
+def create_mock_model():
+    """Create a simple mock Random Forest model for testing"""
+    print("🤖 Creating mock Random Forest model...")
+    
+    # Generate mock training data
+    X, y = generate_mock_data()
+    
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
@@ -83,6 +90,10 @@ def create_mock_model():
     joblib.dump(rf_model, 'rf_model3.pkl')
     print("💾 Model saved as 'rf_model3.pkl'")
     
+    # Save the training distributions for drift monitoring
+    drift.save_reference(drift.build_reference(X_train), drift.reference_path('rf_model3.pkl'))
+    print(f"💾 Reference histograms saved as '{drift.reference_path('rf_model3.pkl')}'")
+    
     return rf_model
 
 if __name__ == "__main__":
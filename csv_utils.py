@@ -1,20 +1,29 @@
 import streamlit as st
 import pandas as pd
-import joblib
 import altair as alt
+import atexit
+import os
+import shutil
+import tempfile
+import drift
+import result_index
+import scoring
+from scoring import validate_transactions  # noqa: F401
 
-# Load the trained Random Forest model
-rf_model = joblib.load('rf_model3.pkl')
+# Load the trained Random Forest model (one copy per process, shared with front6)
+rf_model = scoring.load_model()
+
+# Shared with front6, so uploads and manual checks feed the same drift window
+drift_monitor = drift.load_monitor('rf_model3.pkl')
 
 # Feature list used in the model
 features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
 
-# Fraud detection logic using the trained model
+# Fraud detection logic using the trained model, with the features that drove the verdict
 def detect_fraud(transaction):
-    transaction_df = pd.DataFrame([transaction], columns=features)
-    prediction = int(rf_model.predict(transaction_df)[0])
+    prediction, reasons = scoring.model_verdicts(pd.DataFrame([transaction], columns=features), rf_model)
     issues = {'origin': False, 'destination': False}  # Placeholder for any custom logic
-    return prediction, "ML model prediction: Fraud" if prediction == 1 else "ML model prediction: Not Fraud", issues
+    return int(prediction[0]), reasons[0], issues
 
 # Prevention logic for flagging potential fraud
 def prevent_fraud(transaction):
@@ -36,33 +45,134 @@ def prevent_fraud(transaction):
 
     return "✅ ALLOWED" if not actions else " | ".join(actions)
 
+# Temp directories holding indexed results; whatever is still here is removed at exit
+_results_dirs = set()
+
+def _remove_results(results_dir):
+    _results_dirs.discard(results_dir)
+    shutil.rmtree(results_dir, ignore_errors=True)
+
+@atexit.register
+def _remove_all_results():
+    for results_dir in list(_results_dirs):
+        _remove_results(results_dir)
+
+# Write the results CSV to its own temp directory and index it; returns the CSV path
+def _indexed_results(csv_bytes):
+    results_dir = tempfile.mkdtemp(prefix='fraud_results_')
+    _results_dirs.add(results_dir)
+    path = os.path.join(results_dir, 'fraud_results.csv')
+    with open(path, 'wb') as f:
+        f.write(csv_bytes)
+    result_index.build_index(path)
+    return path
+
+# Stands in for every field of a row with more fields than the header, so the row keeps its place
+_MALFORMED = '\x00malformed'
+
+def _rewind(uploaded_file):
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+
+# Read an upload. Returns (df, malformed): rows with more fields than the header would make
+# read_csv reject the whole file, so they are kept as empty rows and flagged in `malformed`
+# (None when every row parsed)
+def _read_upload(uploaded_file):
+    try:
+        return pd.read_csv(uploaded_file), None
+    except pd.errors.ParserError:
+        _rewind(uploaded_file)
+    width = len(pd.read_csv(uploaded_file, nrows=0).columns)
+    _rewind(uploaded_file)
+    # The python engine is slower, so it only re-reads files that actually have such rows
+    df = pd.read_csv(uploaded_file, engine='python', on_bad_lines=lambda fields: [_MALFORMED] * width)
+
+    marker = df == _MALFORMED
+    malformed = marker.all(axis=1).to_numpy()
+    df = df.mask(marker)
+    # Columns that held the marker were parsed as text; restore the numeric ones
+    for col in df.columns[df.dtypes == object]:
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except (ValueError, TypeError):
+            pass
+    return df, malformed
+
+# Identifies an upload across Streamlit reruns (tests and scripts may pass a file path instead)
+def _upload_key(uploaded_file):
+    return getattr(uploaded_file, 'file_id', None) or str(uploaded_file)
+
+# Read, validate and score an upload once. Streamlit reruns the page on every interaction
+# (including a results query), so the outcome is kept in st.session_state for that upload.
+def _score_upload(uploaded_file):
+    df, malformed = _read_upload(uploaded_file)
+    scored = {'key': _upload_key(uploaded_file), 'head': df.head(), 'missing': False,
+              'df': None, 'quarantined': None, 'csv': None, 'results_path': None}
+
+    # Validate if the uploaded file has the required columns
+    if not all(col in df.columns for col in features):
+        scored['missing'] = True
+        return scored
+
+    # Quarantine malformed rows instead of failing the whole upload
+    df, scored['quarantined'] = validate_transactions(df.reset_index(drop=True), malformed)
+    if df.empty:
+        return scored
+    # Data row number in the upload, the same numbering as the quarantine report and query results
+    df.insert(0, 'row', df.index + 1)
+    df = df.reset_index(drop=True)
+    if drift_monitor is not None:
+        drift_monitor.observe(df[features].to_numpy(dtype=float))
+
+    # Same verdicts as detect_fraud/prevent_fraud, computed for every row with one model call
+    prediction, reasons = scoring.model_verdicts(df, rf_model)
+    df['FraudDetected'] = prediction
+    df['FraudReason'] = reasons
+    df['FraudIssue'] = [{'origin': False, 'destination': False} for _ in range(len(df))]
+    df['PreventionAction'] = scoring.prevent_fraud_batch(df, prediction)
+
+    scored['df'] = df
+    scored['csv'] = df.to_csv(index=False).encode('utf-8')
+    # Investigative queries over the indexed results read only the matching rows
+    scored['results_path'] = _indexed_results(scored['csv'])
+    return scored
+
 # Streamlit interface for bulk fraud detection using CSV upload
 def render_bulk_check(uploaded_file):
     try:
-        # Read the uploaded CSV file into a DataFrame
-        df = pd.read_csv(uploaded_file)
-
-        # Validate if the uploaded file has the required columns
-        if not all(col in df.columns for col in features):
+        scored = st.session_state.get('bulk_results')
+        if scored is None or scored['key'] != _upload_key(uploaded_file):
+            if scored is not None and scored['results_path']:
+                _remove_results(os.path.dirname(scored['results_path']))
+            st.session_state.bulk_results = None
+            scored = _score_upload(uploaded_file)
+            st.session_state.bulk_results = scored
+
+        if scored['missing']:
             st.error(f"Uploaded CSV must contain the following columns:\n{features}")
             return None
 
         st.success("File uploaded successfully!")
-        st.dataframe(df.head())  # Show first few rows of the dataframe
+        st.dataframe(scored['head'])  # Show first few rows of the dataframe
+
+        df, quarantined = scored['df'], scored['quarantined']
+        if not quarantined.empty:
+            st.warning(f"{len(quarantined)} row(s) failed validation and were quarantined; "
+                       f"the remaining {0 if df is None else len(df)} row(s) will be scored.")
+            st.dataframe(quarantined)
+            st.download_button("📥 Download Quarantined Rows", data=quarantined.to_csv(index=False).encode('utf-8'),
+                               file_name='quarantined_rows.csv', mime='text/csv')
+        if df is None:
+            st.error("No valid transactions to score.")
+            return None
+        df = df.copy()
 
         # Fraud detection and prevention logic
         st.markdown("## 🔎 Fraud Detection Results")
 
-        # Apply fraud detection to each row of the DataFrame
-        fraud_results = df[features].apply(lambda row: detect_fraud(row.tolist()), axis=1)
-        df['FraudDetected'] = fraud_results.apply(lambda x: x[0])
-        df['FraudReason'] = fraud_results.apply(lambda x: x[1])
-        df['FraudIssue'] = fraud_results.apply(lambda x: x[2])
-        df['PreventionAction'] = df[features].apply(lambda row: prevent_fraud(row.tolist()), axis=1)
-
         # Display fraud detection results for each transaction
-        for idx, row in df.iterrows():
-            st.markdown(f"---\n### 📄 Transaction {idx + 1}")
+        for _, row in df.iterrows():
+            st.markdown(f"---\n### 📄 Transaction {row['row']}")
             st.write(f"**Step:** {row['step']}  |  **Amount:** {row['amount']}")
             st.write(f"**Origin Balance:** {row['oldbalanceOrg']} → {row['newbalanceOrig']}")
             st.write(f"**Destination Balance:** {row['oldbalanceDest']} → {row['newbalanceDest']}")
@@ -72,8 +182,21 @@ def render_bulk_check(uploaded_file):
             st.warning(f"**Prevention Advice:** {row['PreventionAction']}")
 
         # Optional: Download the results as a CSV file
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button("📥 Download Results as CSV", data=csv, file_name='fraud_results.csv', mime='text/csv')
+        st.download_button("📥 Download Results as CSV", data=scored['csv'], file_name='fraud_results.csv', mime='text/csv')
+
+        # Queries only read the index built when the upload was scored
+        st.markdown("### 🔍 Query Results")
+        with st.form("results_query"):
+            expression = st.text_input("Query", placeholder="fraud and step 100-200 and amount > 250k")
+            run_query = st.form_submit_button("Search")
+        if run_query and expression:
+            try:
+                count, matches = result_index.ResultIndex(scored['results_path']).query(expression, limit=1000)
+            except ValueError as e:
+                st.error(f"Invalid query: {e}")
+            else:
+                st.write(f"**{count}** matching transaction(s)" + (" (showing the first 1000)" if count > 1000 else ""))
+                st.dataframe(matches)
 
         # Visualization: Fraud detection vs flagged status
         st.markdown("### 📊 Visualize Fraud Detection")
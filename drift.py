@@ -0,0 +1,151 @@
+"""
+Incremental feature-drift monitor against the model's training distributions
+
+At training time every feature is binned on its training quantiles and the bin
+counts are stored next to the model (rf_model3.pkl -> rf_model3_reference.json).
+At scoring time each batch is binned once and its counts are added to a rolling
+window, so PSI and a binned KS statistic per feature are maintained in O(bins)
+per batch without rescanning earlier traffic.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Feature list used in the model
+features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
+
+# Usual PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Floor for empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+# Rows needed in the window before PSI/KS are reported; with fewer, sampling noise alone
+# reads as a significant shift (a single transaction gives PSI around 8)
+MIN_ROWS = 500
+
+def reference_path(model_path):
+    """Reference histogram file stored alongside `model_path`"""
+    return os.path.splitext(model_path)[0] + '_reference.json'
+
+def build_reference(X, bins=10):
+    """Bin each training feature on its quantiles; returns {feature: {'edges', 'counts'}}"""
+    X = np.asarray(X, dtype=float)
+    reference = {}
+    for j, name in enumerate(features):
+        column = X[:, j]
+        # Interior cut points only: values outside the training range fall in the end bins
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, column, side='right'), minlength=len(edges) + 1)
+        reference[name] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+    return reference
+
+def save_reference(reference, path):
+    with open(path, 'w') as f:
+        json.dump(reference, f)
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+def psi(expected, actual):
+    """Population stability index between two bin-probability vectors"""
+    expected = np.maximum(expected, _EPSILON)
+    actual = np.maximum(actual, _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def ks(expected, actual):
+    """Kolmogorov-Smirnov statistic between two binned distributions"""
+    return float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+
+class DriftMonitor:
+    """Rolling live histograms per feature compared against the training reference"""
+
+    def __init__(self, reference, window=10000, publish_interval=1.0, min_rows=MIN_ROWS):
+        self.window = window
+        self.publish_interval = publish_interval
+        self.min_rows = min_rows
+        self._published = float('-inf')
+        self._edges = [np.asarray(reference[name]['edges']) for name in features]
+        ref_counts = [np.asarray(reference[name]['counts'], dtype=float) for name in features]
+        self._expected = [counts / counts.sum() for counts in ref_counts]
+        self._totals = [np.zeros(len(counts)) for counts in ref_counts]
+        self._batches = deque()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def observe(self, X):
+        """Add a batch of transactions (rows in feature order) to the live window"""
+        X = np.asarray(X, dtype=float).reshape(-1, len(features))
+        if len(X) == 0:
+            return
+        counts = [np.bincount(np.searchsorted(edges, X[:, j], side='right'), minlength=len(edges) + 1)
+                  for j, edges in enumerate(self._edges)]
+
+        with self._lock:
+            self._batches.append((len(X), counts))
+            self._rows += len(X)
+            for total, batch in zip(self._totals, counts):
+                total += batch
+            # Drop whole batches once the window is full, always keeping the newest one
+            while len(self._batches) > 1 and self._rows - self._batches[0][0] >= self.window:
+                rows, old = self._batches.popleft()
+                self._rows -= rows
+                for total, batch in zip(self._totals, old):
+                    total -= batch
+
+        # Single-transaction scoring calls this per request, so gauges are refreshed at most once per interval
+        if time.monotonic() - self._published >= self.publish_interval:
+            self.stats()
+
+    def _publish(self, stats, rows):
+        self._published = time.monotonic()
+        if rows >= self.min_rows:
+            for row in stats:
+                metrics.set_gauge(f"drift_psi_{row['feature']}", row['psi'])
+                metrics.set_gauge(f"drift_ks_{row['feature']}", row['ks'])
+        metrics.set_gauge("drift_window_rows", rows)
+
+    def _stats(self):
+        rows = []
+        for name, expected, total in zip(features, self._expected, self._totals):
+            actual = total / total.sum() if total.sum() else expected
+            rows.append({'feature': name, 'psi': psi(expected, actual), 'ks': ks(expected, actual)})
+        return rows
+
+    def stats(self):
+        """
+        PSI, KS and a drift status per feature over the current window. Below `min_rows`
+        rows, PSI and KS are NaN, the status is 'insufficient data' and no gauges are published.
+        """
+        with self._lock:
+            stats, rows = self._stats(), self._rows
+        self._publish(stats, rows)
+        df = pd.DataFrame(stats)
+        df['window_rows'] = rows
+        if rows < self.min_rows:
+            df[['psi', 'ks']] = np.nan
+            df['status'] = 'insufficient data'
+            return df
+        df['status'] = np.select([df['psi'] > PSI_SIGNIFICANT, df['psi'] > PSI_MODERATE],
+                                 ['significant', 'moderate'], 'stable')
+        return df
+
+# One monitor per model and process, shared by every module that scores with it
+_monitors = {}
+
+def load_monitor(model_path, window=10000):
+    """Shared DriftMonitor for `model_path`, or None when the model has no reference histograms"""
+    if model_path not in _monitors:
+        path = reference_path(model_path)
+        _monitors[model_path] = DriftMonitor(load_reference(path), window) if os.path.exists(path) else None
+    return _monitors[model_path]
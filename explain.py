@@ -0,0 +1,90 @@
+"""
+Per-feature contribution explanations for Random Forest verdicts
+
+Each node's fraud probability minus its parent's is credited to the feature the
+parent splits on. Summing those deltas along a transaction's decision path gives
+its per-feature contributions, which add up (with the root prior as bias) to the
+model's fraud probability. The sums are precomputed once per model for every
+node, so explaining a batch only needs the leaf ids from model.apply and one
+table lookup per tree.
+"""
+
+import numpy as np
+
+# Precomputed (model, bias, path_sums, offsets) keyed by id(model)
+_tables = {}
+
+def contribution_table(model):
+    """
+    Return (bias, path_sums, offsets) for `model`, building and caching them on first use.
+
+    path_sums[offsets[t] + node] holds the contributions accumulated from the root
+    of tree t down to `node`, already divided by the number of trees.
+    """
+    cached = _tables.get(id(model))
+    if cached is not None and cached[0] is model:
+        return cached[1:]
+
+    fraud_class = list(model.classes_).index(1)
+    n_trees = len(model.estimators_)
+    tables = []
+    offsets = []
+    bias = 0.0
+    offset = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        prob = value[:, fraud_class] / value.sum(axis=1)
+
+        # Node ids are assigned depth-first, so a parent is always filled in before its children
+        sums = np.zeros((tree.node_count, model.n_features_in_))
+        for node in range(tree.node_count):
+            feature = tree.feature[node]
+            for child in (tree.children_left[node], tree.children_right[node]):
+                if child != -1:
+                    sums[child] = sums[node]
+                    sums[child, feature] += prob[child] - prob[node]
+
+        tables.append(sums / n_trees)
+        offsets.append(offset)
+        bias += prob[0]
+        offset += tree.node_count
+
+    entry = (bias / n_trees, np.concatenate(tables), np.array(offsets))
+    _tables[id(model)] = (model,) + entry
+    return entry
+
+def feature_contributions(model, X):
+    """Return (bias, contributions) where contributions is an (n_samples x n_features) array"""
+    # Compiled forests (serve.FlatForest) carry their own copy of the tables
+    if hasattr(model, 'feature_contributions'):
+        return model.feature_contributions(X)
+
+    bias, path_sums, offsets = contribution_table(model)
+    leaves = model.apply(np.asarray(X, dtype=np.float32)) + offsets
+    contributions = np.zeros((leaves.shape[0], path_sums.shape[1]))
+    for t in range(leaves.shape[1]):
+        contributions += path_sums[leaves[:, t]]
+    return bias, contributions
+
+def top_factors(contributions, predictions, feature_names, k=3):
+    """
+    Format the `k` features that pushed each row hardest towards its verdict,
+    e.g. "amount +0.214, oldbalanceOrg +0.081". Rows with no such feature get "".
+    """
+    direction = np.where(np.asarray(predictions) == 1, 1.0, -1.0)[:, None]
+    signed = contributions * direction
+    order = np.argsort(-signed, axis=1)[:, :k]
+    top_values = np.take_along_axis(contributions, order, axis=1)
+    keep = np.take_along_axis(signed, order, axis=1) > 0
+
+    # A forest only produces a limited set of distinct contributions, so format each value once
+    unique_values, inverse = np.unique(top_values, return_inverse=True)
+    labels = np.array([f"{v:+.3f}" for v in unique_values], dtype=object)[inverse.reshape(top_values.shape)]
+    pieces = np.asarray(feature_names, dtype=object)[order] + ' ' + labels
+
+    factors = np.where(keep[:, 0], pieces[:, 0], '').astype(object)
+    for j in range(1, order.shape[1]):
+        factors = np.where(keep[:, j], factors + ', ' + pieces[:, j], factors)
+    return factors.tolist()
@@ -1,39 +1,28 @@
 import streamlit as st
 import pandas as pd
-import joblib
 import altair as alt
-
-# Load trained model
-rf_model = joblib.load('rf_model3.pkl')
-
-# Feature list
-features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
-
-# Detect fraud and determine where (origin/destination)
-def detect_fraud(transaction):
-    step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud = transaction
-    reasons = []
-    issues = {'origin': False, 'destination': False}
-
-    if oldbalanceDest == 0 and newbalanceDest == 0:
-        reasons.append("Destination balance anomaly")
-        issues['destination'] = True
-    if round(newbalanceOrig, 2) != round(oldbalanceOrg - amount, 2):
-        reasons.append("Origin balance mismatch")
-        issues['origin'] = True
-    if oldbalanceDest != 0 and round(newbalanceDest, 2) != round(oldbalanceDest + amount, 2):
-        reasons.append("Destination balance mismatch")
-        issues['destination'] = True
-
-    if reasons:
-        return 1, "; ".join(reasons), issues
-
-    transaction_df = pd.DataFrame([transaction], columns=features)
-    prediction = int(rf_model.predict(transaction_df)[0])
-    return prediction, "ML model prediction: Fraud" if prediction == 1 else "ML model prediction: Not Fraud", issues
+import metrics
+import drift
+import scoring
+from scoring import (features, rule_verdict, model_verdicts, rule_verdict_batch,  # noqa: F401
+                     detect_fraud_batch, prevent_fraud_batch)
+
+# Load trained model (one copy per process, shared with csv_utils)
+rf_model = scoring.load_model()
+
+# Live feature distributions compared against the training data (None without a reference file)
+drift_monitor = drift.load_monitor('rf_model3.pkl')
+
+# Detect fraud and determine where (origin/destination); see scoring.detect_fraud for `deadline`.
+# Each call counts as a scoring request and is added to the drift window.
+def detect_fraud(transaction, deadline=None):
+    metrics.increment("scoring_requests_total")
+    if drift_monitor is not None:
+        drift_monitor.observe(transaction)
+    return scoring.detect_fraud(transaction, deadline)
 
 # Prevention logic
-def prevent_fraud(transaction):
+def prevent_fraud(transaction, deadline=None):
     step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud = transaction
     actions = []
 
@@ -46,12 +35,16 @@ def prevent_fraud(transaction):
     if oldbalanceDest == 0 and newbalanceDest == 0:
         actions.append("🚨 Destination balance anomaly")
 
-    ml_result, _, _ = detect_fraud(transaction)
+    ml_result, _, _ = scoring.detect_fraud(transaction, deadline)
     if ml_result == 1:
         actions.append("🚨 detected fraud")
 
     return "✅ ALLOWED" if not actions else " | ".join(actions)
 
+# Empty grid shown in the Getting Started form
+def _blank_transactions():
+    return pd.DataFrame([[0, 0.0, 0.0, 0.0, 0.0, 0.0, 0]], columns=features)
+
 # Main Streamlit UI
 def main():
     st.title("🛡️ Fraud Detection and Prevention System")
@@ -62,36 +55,52 @@ def main():
         st.session_state.transactions = []
 
     if not st.session_state.show_results:
-        n = st.number_input('🔢 Number of transactions to check:', min_value=1, step=1)
-        transactions = []
-
-        for i in range(n):
-            st.markdown(f"---\n### Transaction {i+1}")
-            step = st.number_input('Step (Time Step)', min_value=0, key=f'step_{i}')
-            amount = st.number_input('Transaction Amount', min_value=0.0, key=f'amount_{i}')
-            oldbalanceOrg = st.number_input('Old Balance (Origin)', min_value=0.0, key=f'oldbalanceOrg_{i}')
-            newbalanceOrig = st.number_input('New Balance (Origin)', min_value=0.0, key=f'newbalanceOrig_{i}')
-            oldbalanceDest = st.number_input('Old Balance (Destination)', min_value=0.0, key=f'oldbalanceDest_{i}')
-            newbalanceDest = st.number_input('New Balance (Destination)', min_value=0.0, key=f'newbalanceDest_{i}')
-            isFlaggedFraud = st.selectbox('Is Transaction Flagged as Fraud?', [0, 1], key=f'isFlaggedFraud_{i}')
-
-            transaction = [step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud]
-            transactions.append(transaction)
-
-        if st.button("🚨 Detect Fraud and View Results"):
-            st.session_state.transactions = transactions
-            st.session_state.show_results = True
+        st.markdown("🔢 Enter one transaction per row (use **+** to add rows). Nothing is scored until you submit.")
+
+        if st.session_state.transactions:
+            grid = pd.DataFrame(st.session_state.transactions, columns=features)
+        else:
+            grid = _blank_transactions()
+
+        # The form holds all edits client-side, so typing does not rerun the script
+        with st.form("transactions_form"):
+            edited = st.data_editor(
+                grid,
+                num_rows="dynamic",
+                use_container_width=True,
+                column_config={
+                    'step': st.column_config.NumberColumn('Step (Time Step)', min_value=0, step=1, default=0),
+                    'amount': st.column_config.NumberColumn('Transaction Amount', min_value=0.0, default=0.0),
+                    'oldbalanceOrg': st.column_config.NumberColumn('Old Balance (Origin)', min_value=0.0, default=0.0),
+                    'newbalanceOrig': st.column_config.NumberColumn('New Balance (Origin)', min_value=0.0, default=0.0),
+                    'oldbalanceDest': st.column_config.NumberColumn('Old Balance (Destination)', min_value=0.0, default=0.0),
+                    'newbalanceDest': st.column_config.NumberColumn('New Balance (Destination)', min_value=0.0, default=0.0),
+                    'isFlaggedFraud': st.column_config.SelectboxColumn('Is Transaction Flagged as Fraud?', options=[0, 1], default=0),
+                },
+                key="transactions_grid",
+            )
+            submitted = st.form_submit_button("🚨 Detect Fraud and View Results")
+
+        if submitted:
+            edited = edited.dropna(how='all').fillna(0).astype({'step': int, 'isFlaggedFraud': int})
+            if edited.empty:
+                st.warning("Please enter at least one transaction.")
+            else:
+                st.session_state.transactions = [list(row) for row in edited[features].itertuples(index=False)]
+                # Score and observe drift once per submission; reruns of the results view reuse this
+                df = edited[features].reset_index(drop=True)
+                if drift_monitor is not None:
+                    drift_monitor.observe(df.to_numpy(dtype=float))
+                df = df.join(detect_fraud_batch(df))
+                df['PreventionAction'] = prevent_fraud_batch(df, df['FraudDetected'])
+                st.session_state.results = df
+                st.session_state.show_results = True
+                st.rerun()
 
     else:
         st.markdown("## 🔎 Fraud Detection Results")
 
-        df = pd.DataFrame(st.session_state.transactions, columns=features)
-
-        fraud_results = df[features].apply(lambda row: detect_fraud(row.tolist()), axis=1)
-        df['FraudDetected'] = fraud_results.apply(lambda x: x[0])
-        df['FraudReason'] = fraud_results.apply(lambda x: x[1])
-        df['FraudIssue'] = fraud_results.apply(lambda x: x[2])
-        df['PreventionAction'] = df[features].apply(lambda row: prevent_fraud(row.tolist()), axis=1)
+        df = st.session_state.results.copy()
 
         for idx, row in df.iterrows():
             issues = row['FraudIssue']
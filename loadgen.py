@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Synthetic load generator and replay harness for end-to-end latency testing
+
+Replays a CSV in the sample_bulk_transactions.csv format, or a synthetic stream
+with a set fraud rate, at a target rate (open-loop) into the in-process scorer
+or a local scoring service, and reports latency percentiles, throughput and
+errors over time.
+
+With --url, each transaction is sent as its own HTTP request:
+    POST <url>  Content-Type: application/json
+        {"transaction": [step, amount, oldbalanceOrg, newbalanceOrig,
+                         oldbalanceDest, newbalanceDest, isFlaggedFraud],
+         "deadline": 0.005}            (seconds; only sent with --deadline-ms)
+    200 response  JSON object; a true "degraded" field counts the verdict as
+                  degraded, any other 2xx body counts as ok
+Non-2xx responses, timeouts and connection failures count as errors.
+
+Examples:
+    python loadgen.py --csv sample_bulk_transactions.csv --tps 1000 --duration 30
+    python loadgen.py --fraud-rate 0.02 --tps 10000 --duration 10 --deadline-ms 5
+    python loadgen.py --tps 2000 --url http://127.0.0.1:8000/score
+"""
+
+import argparse
+import gc
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Feature list used in the model
+features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
+
+PERCENTILES = [50, 95, 99, 99.9]
+
+def synthesize_transactions(n, fraud_rate, seed=42):
+    """Generate `n` transactions, a `fraud_rate` share of which drain the origin account"""
+    rng = np.random.default_rng(seed)
+
+    step = rng.integers(1, 744, n)
+    amount = rng.uniform(100, 100000, n).round(2)
+    oldbalanceOrg = (amount + rng.uniform(0, 200000, n)).round(2)
+    newbalanceOrig = (oldbalanceOrg - amount).round(2)
+    oldbalanceDest = rng.uniform(0, 200000, n).round(2)
+    newbalanceDest = (oldbalanceDest + amount).round(2)
+    isFlaggedFraud = np.zeros(n, dtype=int)
+
+    # Fraudulent transfers empty the origin account into an untracked destination
+    fraud = rng.random(n) < fraud_rate
+    oldbalanceOrg[fraud] = amount[fraud]
+    newbalanceOrig[fraud] = 0
+    oldbalanceDest[fraud] = 0
+    newbalanceDest[fraud] = 0
+    isFlaggedFraud[fraud] = rng.random(fraud.sum()) < 0.1
+
+    return pd.DataFrame({
+        'step': step,
+        'amount': amount,
+        'oldbalanceOrg': oldbalanceOrg,
+        'newbalanceOrig': newbalanceOrig,
+        'oldbalanceDest': oldbalanceDest,
+        'newbalanceDest': newbalanceDest,
+        'isFlaggedFraud': isFlaggedFraud,
+    })
+
+def load_transactions(path):
+    """Read a CSV in the bulk upload format"""
+    df = pd.read_csv(path)
+    missing = [col for col in features if col not in df.columns]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {missing}")
+    return df[features]
+
+def make_local_target(deadline=None):
+    """Score through front6.detect_fraud in this process; returns True when degraded"""
+    import front6
+
+    # Keep the startup heap out of full collections, whose pauses would otherwise show up
+    # as latency spikes well past any deadline (serve.py does the same before forking)
+    gc.collect()
+    gc.freeze()
+
+    def target(transaction):
+        _, _, issues = front6.detect_fraud(transaction, deadline)
+        return issues['degraded']
+    return target
+
+def make_http_target(url, timeout=5.0, deadline=None):
+    """Score through a service implementing the POST contract in the module docstring"""
+    def target(transaction):
+        payload = {'transaction': transaction}
+        if deadline is not None:
+            payload['deadline'] = deadline
+        request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.loads(response.read())
+        return bool(body.get('degraded', False))
+    return target
+
+def run_load(target, transactions, tps, duration, concurrency=64):
+    """
+    Send transactions to `target` at `tps` per second for `duration` seconds.
+
+    Requests are scheduled open-loop: send times are fixed up front and never wait
+    for earlier responses, and latency is measured from the scheduled send time, so
+    queueing inside the harness is counted against the system under test.
+    Returns a DataFrame with one row per request (offset, latency, status).
+    """
+    rows = transactions[features].values.tolist()
+    total = int(tps * duration)
+    offsets = np.arange(total) / tps
+    latencies = np.full(total, np.nan)
+    statuses = np.empty(total, dtype=object)
+    lock = threading.Lock()
+
+    def fire(i, scheduled):
+        try:
+            status = 'degraded' if target(rows[i % len(rows)]) else 'ok'
+        except Exception:
+            status = 'error'
+        latency = time.perf_counter() - scheduled
+        with lock:
+            latencies[i] = latency
+            statuses[i] = status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            scheduled = start + offsets[i]
+            delay = scheduled - time.perf_counter()
+            # Sleep granularity is ~1ms; at higher rates requests go out in small bursts
+            if delay > 0.001:
+                time.sleep(delay)
+            pool.submit(fire, i, scheduled)
+
+    return pd.DataFrame({'offset': offsets, 'latency': latencies, 'status': statuses})
+
+def summarize(results, interval=1.0):
+    """Aggregate per-request results into fixed windows plus an overall row"""
+    results = results.assign(
+        window=(results['offset'] // interval).astype(int),
+        completed=results['offset'] + results['latency'],
+    )
+
+    def stats(group, span):
+        latency_ms = group['latency'].to_numpy() * 1000
+        row = {
+            'requests': len(group),
+            'errors': int((group['status'] == 'error').sum()),
+            'degraded': int((group['status'] == 'degraded').sum()),
+            'throughput': len(group) / span,
+        }
+        for p, value in zip(PERCENTILES, np.percentile(latency_ms, PERCENTILES)):
+            row[f'p{p}_ms'] = round(value, 3)
+        return row
+
+    windows = []
+    for window, group in results.groupby('window'):
+        row = stats(group, interval)
+        # Throughput counts completions inside the window, not requests scheduled in it
+        row['throughput'] = int(((results['completed'] // interval) == window).sum()) / interval
+        windows.append({'window_start_s': window * interval, **row})
+
+    span = max(results['completed'].max(), interval)
+    overall = stats(results, span)
+    return pd.DataFrame(windows), overall
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the fraud scorer")
+    parser.add_argument('--csv', help="replay transactions from this CSV instead of synthesizing them")
+    parser.add_argument('--fraud-rate', type=float, default=0.01, help="fraud share of synthetic transactions")
+    parser.add_argument('--rows', type=int, default=100000, help="number of synthetic transactions to cycle through")
+    parser.add_argument('--tps', type=float, default=1000, help="target transactions per second")
+    parser.add_argument('--duration', type=float, default=10, help="test length in seconds")
+    parser.add_argument('--concurrency', type=int, default=64, help="maximum requests in flight")
+    parser.add_argument('--deadline-ms', type=float, help="scoring deadline passed to detect_fraud")
+    parser.add_argument('--url', help="score against a local service instead of in-process")
+    parser.add_argument('--interval', type=float, default=1.0, help="reporting window in seconds")
+    parser.add_argument('--output', help="write the per-window table to this CSV")
+    args = parser.parse_args()
+
+    transactions = load_transactions(args.csv) if args.csv else synthesize_transactions(args.rows, args.fraud_rate)
+    deadline = args.deadline_ms / 1000 if args.deadline_ms is not None else None
+    target = make_http_target(args.url, deadline=deadline) if args.url else make_local_target(deadline)
+
+    print(f"🚀 Sending {int(args.tps * args.duration)} transactions at {args.tps:g} TPS "
+          f"to {args.url or 'in-process scorer'}...")
+    results = run_load(target, transactions, args.tps, args.duration, args.concurrency)
+    windows, overall = summarize(results, args.interval)
+
+    print(windows.to_string(index=False))
+    print("\n📊 Overall")
+    for name, value in overall.items():
+        print(f"   {name}: {value:g}" if isinstance(value, float) else f"   {name}: {value}")
+
+    if args.output:
+        windows.to_csv(args.output, index=False)
+        print(f"💾 Results saved as '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+In-process metrics registry for the fraud detection system
+"""
+
+import threading
+
+_lock = threading.Lock()
+_values = {}
+
+def increment(name, value=1):
+    """Increase the counter `name` by `value`"""
+    with _lock:
+        _values[name] = _values.get(name, 0) + value
+
+def set_gauge(name, value):
+    """Set `name` to `value`, replacing the previous reading"""
+    with _lock:
+        _values[name] = value
+
+def get(name):
+    """Return the current value of `name` (0 if never set)"""
+    with _lock:
+        return _values.get(name, 0)
+
+def snapshot():
+    """Return a copy of every counter and gauge"""
+    with _lock:
+        return dict(_values)
+
+def reset():
+    """Clear every counter and gauge"""
+    with _lock:
+        _values.clear()
+
+def format_metrics():
+    """Render the metrics as `name value` lines, sorted by name"""
+    return "\n".join(f"{name} {value:g}" if isinstance(value, float) else f"{name} {value}"
+                     for name, value in sorted(snapshot().items()))
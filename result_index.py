@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Range index over scored results for fast investigative queries
+
+Builds a compact on-disk index next to a results CSV (fraud_results.csv ->
+fraud_results.csv.idx/): the byte offset of every row, `step` and `amount`
+sorted with their row ids, and bitmaps for `FraudDetected` and `isFlaggedFraud`.
+Range conditions are answered with a binary search and verdict conditions with
+bitmap tests, and only the matching rows are read back from the CSV.
+
+Queries are conditions joined with "and", for example:
+    fraud and step 100-200 and amount > 250k
+    not fraud and flagged
+    amount >= 1m and FraudDetected = 1
+
+Examples:
+    python result_index.py build fraud_results.csv
+    python result_index.py query fraud_results.csv "fraud and step 100-200 and amount > 250k"
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Columns kept sorted for range conditions, and 0/1 columns kept as bitmaps
+range_columns = ['step', 'amount']
+bitmap_columns = ['FraudDetected', 'isFlaggedFraud']
+
+KEYWORDS = {
+    'fraud': ('FraudDetected', 1),
+    'flagged': ('isFlaggedFraud', 1),
+}
+
+_SUFFIXES = {'k': 1e3, 'm': 1e6, 'b': 1e9}
+_NUMBER = r'(-?\d+(?:\.\d+)?[kmb]?)'
+_RANGE = re.compile(rf'^(\w+)\s+{_NUMBER}\s*(?:-|–|\.\.|to)\s*{_NUMBER}$', re.IGNORECASE)
+_COMPARE = re.compile(rf'^(\w+)\s*(<=|>=|==|=|<|>)\s*{_NUMBER}$', re.IGNORECASE)
+
+# Bytes scanned per pass when locating row boundaries
+_CHUNK = 1 << 26
+
+def index_dir(csv_path):
+    return csv_path + '.idx'
+
+def _row_offsets(csv_path):
+    """Byte offset of the header end and of every row start, plus the end of file"""
+    data = np.memmap(csv_path, dtype=np.uint8, mode='r')
+    newlines = [np.flatnonzero(data[start:start + _CHUNK] == ord('\n')) + start
+                for start in range(0, len(data), _CHUNK)]
+    ends = np.concatenate(newlines) + 1 if newlines else np.array([], dtype=np.int64)
+    if len(ends) == 0 or ends[-1] != len(data):
+        ends = np.append(ends, len(data))
+    return ends.astype(np.int64)
+
+def build_index(csv_path):
+    """Index the results CSV at `csv_path`; returns the index directory"""
+    offsets = _row_offsets(csv_path)
+    columns = pd.read_csv(csv_path, usecols=range_columns + bitmap_columns)
+    if len(offsets) - 1 != len(columns):
+        raise ValueError("Results CSV has fields spanning several lines; it cannot be indexed by row offset")
+
+    path = index_dir(csv_path)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'offsets.npy'), offsets)
+    for col in range_columns:
+        values = columns[col].to_numpy(dtype=float)
+        order = np.argsort(values, kind='stable').astype(np.int64)
+        np.save(os.path.join(path, f'{col}.order.npy'), order)
+        np.save(os.path.join(path, f'{col}.sorted.npy'), values[order])
+    for col in bitmap_columns:
+        np.save(os.path.join(path, f'{col}.bits.npy'), np.packbits(columns[col].to_numpy() == 1))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'rows': len(columns), 'csv_size': os.path.getsize(csv_path)}, f)
+    return path
+
+def _number(text):
+    text = text.lower()
+    if text[-1] in _SUFFIXES:
+        return float(text[:-1]) * _SUFFIXES[text[-1]]
+    return float(text)
+
+def _column(name):
+    for col in range_columns + bitmap_columns:
+        if col.lower() == name.lower():
+            return col
+    raise ValueError(f"Unknown column '{name}'; queries can use {range_columns + bitmap_columns}")
+
+def parse_query(expression):
+    """
+    Parse a query into conditions: ('range', column, low, high, low_inclusive, high_inclusive)
+    or ('bitmap', column, value).
+    """
+    conditions = []
+    for part in re.split(r'\s+and\s+|,', expression.strip(), flags=re.IGNORECASE):
+        part = part.strip()
+        if not part:
+            continue
+        negate = part.lower().startswith('not ')
+        word = part[4:].strip().lower() if negate else part.lower()
+        if word in KEYWORDS:
+            col, value = KEYWORDS[word]
+            conditions.append(('bitmap', col, 1 - value if negate else value))
+            continue
+
+        match = _RANGE.match(part)
+        if match:
+            col = _column(match.group(1))
+            conditions.append(('range', col, _number(match.group(2)), _number(match.group(3)), True, True))
+            continue
+
+        match = _COMPARE.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse condition '{part}'")
+        col, op, value = _column(match.group(1)), match.group(2), _number(match.group(3))
+        if col in bitmap_columns:
+            if op not in ('=', '==') or value not in (0, 1):
+                raise ValueError(f"{col} only supports '= 0' or '= 1'")
+            conditions.append(('bitmap', col, int(value)))
+        elif op in ('=', '=='):
+            conditions.append(('range', col, value, value, True, True))
+        elif op in ('>', '>='):
+            conditions.append(('range', col, value, np.inf, op == '>=', True))
+        else:
+            conditions.append(('range', col, -np.inf, value, True, op == '<='))
+    if not conditions:
+        raise ValueError("Empty query")
+    return conditions
+
+class ResultIndex:
+    """Memory-mapped index over a results CSV built by build_index"""
+
+    def __init__(self, csv_path):
+        path = index_dir(csv_path)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['csv_size'] != os.path.getsize(csv_path):
+            raise ValueError(f"Index for '{csv_path}' is stale; rebuild it with build_index")
+        self.rows = meta['rows']
+        self.csv = np.memmap(csv_path, dtype=np.uint8, mode='r')
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.order = {col: np.load(os.path.join(path, f'{col}.order.npy'), mmap_mode='r') for col in range_columns}
+        self.sorted = {col: np.load(os.path.join(path, f'{col}.sorted.npy'), mmap_mode='r') for col in range_columns}
+        self.bits = {col: np.load(os.path.join(path, f'{col}.bits.npy'), mmap_mode='r') for col in bitmap_columns}
+
+    def _range_ids(self, col, low, high, low_inclusive, high_inclusive):
+        values = self.sorted[col]
+        start = np.searchsorted(values, low, side='left' if low_inclusive else 'right')
+        stop = np.searchsorted(values, high, side='right' if high_inclusive else 'left')
+        return np.sort(self.order[col][start:stop])
+
+    def _bit_test(self, col, ids, value):
+        bits = (self.bits[col][ids >> 3] >> (7 - (ids & 7))) & 1
+        return ids[bits == value]
+
+    def select(self, expression):
+        """Sorted row ids (0-based) matching `expression`"""
+        conditions = parse_query(expression)
+        ranges = [c for c in conditions if c[0] == 'range']
+        bitmaps = [c for c in conditions if c[0] == 'bitmap']
+
+        if ranges:
+            # Start from the narrowest range so later steps work on the fewest rows
+            candidates = [self._range_ids(*c[1:]) for c in ranges]
+            candidates.sort(key=len)
+            ids = candidates[0]
+            for other in candidates[1:]:
+                ids = ids[np.isin(ids, other, assume_unique=True)]
+        else:
+            col, value = bitmaps[0][1], bitmaps[0][2]
+            bits = np.unpackbits(self.bits[col], count=self.rows).astype(bool)
+            ids = np.flatnonzero(bits if value == 1 else ~bits)
+            bitmaps = bitmaps[1:]
+
+        for _, col, value in bitmaps:
+            ids = self._bit_test(col, ids, value)
+        return ids
+
+    def fetch(self, ids, limit=None):
+        """
+        Read only the rows `ids` from the CSV. A `row` column in the CSV (the upload's data row
+        number) is returned as is; otherwise a leading `row` column gives their 1-based position.
+        """
+        ids = np.asarray(ids, dtype=np.int64)[:limit]
+        header = self.csv[:self.offsets[0]].tobytes()
+        body = b''
+        if len(ids):
+            # Read consecutive rows with one slice each
+            breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+            starts = ids[np.concatenate([[0], breaks])]
+            stops = ids[np.concatenate([breaks - 1, [len(ids) - 1]])] + 1
+            body = b''.join(self.csv[self.offsets[a]:self.offsets[b]].tobytes() for a, b in zip(starts, stops))
+        df = pd.read_csv(io.BytesIO(header + body))
+        if 'row' not in df.columns:
+            df.insert(0, 'row', ids + 1)
+        return df
+
+    def query(self, expression, limit=None):
+        """Return (number of matches, DataFrame of up to `limit` matching rows)"""
+        ids = self.select(expression)
+        return len(ids), self.fetch(ids, limit)
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and query scored fraud results")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index a results CSV")
+    build.add_argument('csv')
+    query = commands.add_parser('query', help="query an indexed results CSV")
+    query.add_argument('csv')
+    query.add_argument('expression')
+    query.add_argument('--limit', type=int, default=50, help="rows to print (default: 50)")
+    query.add_argument('--output', help="write every matching row to this CSV")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        path = build_index(args.csv)
+        print(f"💾 Index saved in '{path}'")
+        return
+
+    if not os.path.exists(index_dir(args.csv)):
+        print(f"🔧 Building index for '{args.csv}'...")
+        build_index(args.csv)
+    index = ResultIndex(args.csv)
+    count, rows = index.query(args.expression, None if args.output else args.limit)
+    print(f"🔎 {count} matching row(s)")
+    if args.output:
+        rows.to_csv(args.output, index=False)
+        print(f"💾 Matches saved as '{args.output}'")
+    else:
+        print(rows.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
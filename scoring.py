@@ -0,0 +1,261 @@
+"""
+Streamlit-free scoring rules shared by the app and the scoring server
+
+Holds the balance and amount rules, the model verdicts with their top factors,
+the vectorized batch versions and the transaction validation. Nothing here is
+loaded at import: the default model is unpickled on first use, so serve.py can
+import this module before forking without loading rf_model3.pkl.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import explain
+import metrics
+
+# Feature list used in the model
+features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
+
+MODEL_PATH = 'rf_model3.pkl'
+
+_model = None
+_model_lock = threading.Lock()
+
+def load_model():
+    """The trained model at MODEL_PATH, unpickled once per process on first use"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = joblib.load(MODEL_PATH)
+        return _model
+
+# Model calls that may run at once under a deadline, abandoned ones included. A call that
+# misses its deadline keeps running (threads cannot be interrupted) and holds its slot until it
+# finishes, so new requests fall back to the rules instead of queueing behind it. Inference
+# threads share the GIL, so extra slots mostly add contention; serve.py scales with processes.
+INFERENCE_SLOTS = 1
+
+_inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_SLOTS, thread_name_prefix="rf-inference")
+_inference_slots = threading.BoundedSemaphore(INFERENCE_SLOTS)
+
+def _start_inference(remaining, *args):
+    """Run model_verdicts(*args) on an idle worker, or return None when `remaining` is spent or none is idle"""
+    if remaining <= 0 or not _inference_slots.acquire(blocking=False):
+        return None
+    future = _inference_pool.submit(model_verdicts, *args)
+    future.add_done_callback(lambda _: _inference_slots.release())
+    return future
+
+def rule_verdict(transaction):
+    """Rule-only verdict from the amount checks, used when the model misses its deadline"""
+    step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud = transaction
+    reasons = []
+
+    if isFlaggedFraud == 1:
+        reasons.append("Flagged by system")
+    if amount > 50000:
+        reasons.append("High transaction amount")
+    if oldbalanceOrg < amount:
+        reasons.append("Insufficient origin balance")
+
+    if reasons:
+        return 1, "Rule-based fallback: " + "; ".join(reasons)
+    return 0, "Rule-based fallback: Not Fraud"
+
+def model_verdicts(transaction_df, model=None):
+    """
+    Model verdicts for a DataFrame of transactions, with each row's top contributing features.
+    `model` defaults to load_model(); serve.py passes its memory-mapped FlatForest.
+    """
+    model = load_model() if model is None else model
+    prediction = model.predict(transaction_df[features]).astype(int)
+    _, contributions = explain.feature_contributions(model, transaction_df[features])
+    factors = explain.top_factors(contributions, prediction, features)
+    reasons = [
+        ("ML model prediction: Fraud" if p == 1 else "ML model prediction: Not Fraud")
+        + (f" (top factors: {f})" if f else "")
+        for p, f in zip(prediction, factors)
+    ]
+    return prediction, reasons
+
+def detect_fraud(transaction, deadline=None):
+    """
+    Verdict, reason and issues (origin/destination/degraded) for one transaction.
+
+    With `deadline` (seconds), model inference that cannot finish in time is abandoned and
+    the rule-only verdict is returned instead, with issues['degraded'] set. The rules are used
+    straight away when the budget is already spent or all INFERENCE_SLOTS are busy. Nothing is
+    counted or observed here; front6.detect_fraud does that for interactive scoring.
+
+    The bound is only as tight as the GIL allows: a waiting caller can overrun `deadline` by
+    up to sys.getswitchinterval() (5 ms by default) per busy inference thread before it gets
+    the interpreter back to return the fallback.
+    """
+    started = time.perf_counter()
+    step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud = transaction
+    reasons = []
+    issues = {'origin': False, 'destination': False, 'degraded': False}
+
+    if oldbalanceDest == 0 and newbalanceDest == 0:
+        reasons.append("Destination balance anomaly")
+        issues['destination'] = True
+    if round(newbalanceOrig, 2) != round(oldbalanceOrg - amount, 2):
+        reasons.append("Origin balance mismatch")
+        issues['origin'] = True
+    if oldbalanceDest != 0 and round(newbalanceDest, 2) != round(oldbalanceDest + amount, 2):
+        reasons.append("Destination balance mismatch")
+        issues['destination'] = True
+
+    if reasons:
+        return 1, "; ".join(reasons), issues
+
+    transaction_df = pd.DataFrame([transaction], columns=features)
+    if deadline is None:
+        prediction, reasons = model_verdicts(transaction_df)
+    else:
+        remaining = deadline - (time.perf_counter() - started)
+        future = _start_inference(remaining, transaction_df)
+        try:
+            if future is None:
+                raise FutureTimeout()
+            prediction, reasons = future.result(timeout=max(deadline - (time.perf_counter() - started), 0))
+        except FutureTimeout:
+            metrics.increment("scoring_degraded_total")
+            issues['degraded'] = True
+            prediction, reason = rule_verdict(transaction)
+            return prediction, reason, issues
+
+    return int(prediction[0]), reasons[0], issues
+
+def _join_reasons(checks, index, sep):
+    """Join the reason text of every mask that is set, row by row, with `sep`"""
+    joined = pd.Series('', index=index)
+    for mask, text in checks:
+        prefix = np.where(joined == '', '', sep)
+        joined = joined.where(~mask, joined + prefix + text)
+    return joined
+
+def rule_verdict_batch(df):
+    """Vectorized rule_verdict for a DataFrame of transactions"""
+    amount = df['amount'].to_numpy(dtype=float)
+    reasons = _join_reasons([
+        (df['isFlaggedFraud'].to_numpy() == 1, "Flagged by system"),
+        (amount > 50000, "High transaction amount"),
+        (df['oldbalanceOrg'].to_numpy(dtype=float) < amount, "Insufficient origin balance"),
+    ], df.index, "; ")
+    prediction = (reasons != '').to_numpy().astype(int)
+    return prediction, ("Rule-based fallback: " + reasons.where(reasons != '', "Not Fraud")).tolist()
+
+def detect_fraud_batch(df, model=None, deadline=None):
+    """
+    Vectorized detect_fraud for a DataFrame of transactions.
+
+    The balance rules run column-wise and the remaining rows go to the model in a single
+    predict call. With `deadline` (seconds), the model rows fall back to rule_verdict_batch
+    when inference cannot finish in time, under the same rules as detect_fraud. Drift is not
+    observed here: callers add each batch to their monitor once.
+    """
+    started = time.perf_counter()
+    step, amount, oldbalanceOrg, newbalanceOrig, oldbalanceDest, newbalanceDest, isFlaggedFraud = (
+        df[col].to_numpy(dtype=float) for col in features)
+    metrics.increment("scoring_requests_total", len(df))
+
+    dest_anomaly = (oldbalanceDest == 0) & (newbalanceDest == 0)
+    origin_mismatch = np.round(newbalanceOrig, 2) != np.round(oldbalanceOrg - amount, 2)
+    dest_mismatch = (oldbalanceDest != 0) & (np.round(newbalanceDest, 2) != np.round(oldbalanceDest + amount, 2))
+    rule_hit = dest_anomaly | origin_mismatch | dest_mismatch
+
+    reasons = _join_reasons([
+        (dest_anomaly, "Destination balance anomaly"),
+        (origin_mismatch, "Origin balance mismatch"),
+        (dest_mismatch, "Destination balance mismatch"),
+    ], df.index, "; ")
+
+    prediction = rule_hit.astype(int)
+    ml_rows = ~rule_hit
+    degraded = False
+    if ml_rows.any() and deadline is None:
+        prediction[ml_rows], reasons[ml_rows] = model_verdicts(df.loc[ml_rows], model)
+    elif ml_rows.any():
+        remaining = deadline - (time.perf_counter() - started)
+        future = _start_inference(remaining, df.loc[ml_rows], model)
+        try:
+            if future is None:
+                raise FutureTimeout()
+            prediction[ml_rows], reasons[ml_rows] = future.result(
+                timeout=max(deadline - (time.perf_counter() - started), 0))
+        except FutureTimeout:
+            metrics.increment("scoring_degraded_total", int(ml_rows.sum()))
+            degraded = True
+            prediction[ml_rows], reasons[ml_rows] = rule_verdict_batch(df.loc[ml_rows])
+
+    issues = [{'origin': bool(o), 'destination': bool(d), 'degraded': degraded and bool(m)}
+              for o, d, m in zip(origin_mismatch, dest_anomaly | dest_mismatch, ml_rows)]
+    return pd.DataFrame({'FraudDetected': prediction, 'FraudReason': reasons, 'FraudIssue': issues},
+                        index=df.index)
+
+def prevent_fraud_batch(df, fraud_detected):
+    """Vectorized prevent_fraud, reusing the FraudDetected column from detect_fraud_batch"""
+    amount = df['amount'].to_numpy(dtype=float)
+    oldbalanceOrg = df['oldbalanceOrg'].to_numpy(dtype=float)
+
+    actions = _join_reasons([
+        (df['isFlaggedFraud'].to_numpy() == 1, "⚠️ WARNING: Transaction is flagged as fraud and may not be safe."),
+        (amount > 50000, "🚨 High transaction amount"),
+        (oldbalanceOrg < amount, "🚨 Insufficient origin balance"),
+        ((df['oldbalanceDest'].to_numpy() == 0) & (df['newbalanceDest'].to_numpy() == 0), "🚨 Destination balance anomaly"),
+        (np.asarray(fraud_detected) == 1, "🚨 detected fraud"),
+    ], df.index, " | ")
+    return actions.where(actions != '', "✅ ALLOWED")
+
+# Columns that can never be negative
+non_negative = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
+
+def validate_transactions(df, malformed=None):
+    """
+    Column-wise validation of transactions. Returns (clean, quarantined): clean holds the
+    valid rows with numeric dtypes, quarantined holds the rejected rows with their 1-based data
+    row number (position among the parsed rows, not the physical line in the file) and the reasons.
+    `malformed` is an optional mask of rows that had more fields than the header; they are
+    quarantined for that reason alone.
+    """
+    numeric = {col: pd.to_numeric(df[col], errors='coerce') for col in features}
+    clean = df.assign(**numeric)
+    checks = []
+
+    for col in features:
+        missing = df[col].isna().to_numpy()
+        checks.append((missing, f"missing {col}"))
+        checks.append((numeric[col].isna().to_numpy() & ~missing, f"{col} is not a number"))
+        checks.append((np.isinf(numeric[col].to_numpy(dtype=float)), f"{col} is infinite"))
+
+    for col in non_negative:
+        checks.append(((clean[col] < 0).to_numpy(), f"negative {col}"))
+    checks.append(((clean['step'] % 1 > 0).to_numpy(), "step is not a whole number"))
+    checks.append((clean['isFlaggedFraud'].notna().to_numpy() & ~clean['isFlaggedFraud'].isin([0, 1]).to_numpy(),
+                   "isFlaggedFraud must be 0 or 1"))
+    if malformed is not None:
+        malformed = np.asarray(malformed, dtype=bool)
+        checks = [(malformed, "more fields than the header")] + [(mask & ~malformed, text) for mask, text in checks]
+
+    bad = np.logical_or.reduce([mask for mask, _ in checks])
+    # Reason strings are only built for the (usually few) rejected rows
+    reasons = pd.Series('', index=df.index[bad])
+    for mask, text in checks:
+        hit = mask[bad]
+        if hit.any():
+            prefix = np.where(reasons == '', '', '; ')
+            reasons = reasons.where(~hit, reasons + prefix + text)
+
+    quarantined = df[bad].copy()
+    quarantined.insert(0, 'row', np.flatnonzero(bad) + 1)
+    quarantined['reason'] = reasons
+
+    if bad.any():
+        clean = clean[~bad]
+    return clean.astype({'step': int, 'isFlaggedFraud': int}), quarantined
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Pre-fork multi-process scoring server
+
+The parent compiles rf_model3.pkl into flat node arrays on disk, memory-maps them
+read-only and then forks the workers, so every worker scores from the same
+physical pages instead of unpickling its own copy of the model. A supervisor
+loop in the parent restarts workers that exit.
+
+Endpoints:
+    POST /score    {"transaction": [...]} or {"transactions": [[...], ...]}
+                   400 with the rejected rows when any value fails validation
+                   optional "deadline" (seconds): model rows that miss it get the
+                   rule-only verdict with "degraded": true, as in scoring.detect_fraud
+    GET  /metrics  counters, drift gauges and server_worker_pid of the worker that
+                   answered; each worker keeps its own, so sum or compare across
+                   workers when scraping
+
+Example:
+    python serve.py --workers 8 --port 8000
+    python loadgen.py --tps 5000 --url http://127.0.0.1:8000/score
+"""
+
+import argparse
+import gc
+import json
+import os
+import signal
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import drift
+import explain
+import metrics
+import scoring
+
+# Feature list used in the model
+features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
+
+NODE_DTYPE = np.dtype([
+    ('left', np.int32),
+    ('right', np.int32),
+    ('feature', np.int32),
+    ('threshold', np.float64),
+    ('fraud_prob', np.float64),
+])
+
+def compile_forest(model, path, source=None):
+    """
+    Write `model` to the directory `path` as flat .npy arrays that FlatForest can memory-map.
+    `source` (see model_stamp) records which model file the image was built from.
+    """
+    os.makedirs(path, exist_ok=True)
+    fraud_class = list(model.classes_).index(1)
+    bias, path_sums, roots = explain.contribution_table(model)
+
+    nodes = np.empty(path_sums.shape[0], dtype=NODE_DTYPE)
+    for root, estimator in zip(roots, model.estimators_):
+        tree = estimator.tree_
+        span = slice(root, root + tree.node_count)
+        value = tree.value[:, 0, :]
+        # Child ids become global indices; leaves keep -1
+        nodes['left'][span] = np.where(tree.children_left == -1, -1, tree.children_left + root)
+        nodes['right'][span] = np.where(tree.children_right == -1, -1, tree.children_right + root)
+        nodes['feature'][span] = tree.feature
+        nodes['threshold'][span] = tree.threshold
+        nodes['fraud_prob'][span] = value[:, fraud_class] / value.sum(axis=1)
+
+    np.save(os.path.join(path, 'nodes.npy'), nodes)
+    np.save(os.path.join(path, 'path_sums.npy'), path_sums)
+    np.save(os.path.join(path, 'roots.npy'), roots.astype(np.int64))
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'bias': bias, 'classes': [int(c) for c in model.classes_],
+                   'n_features': int(model.n_features_in_), 'source': source}, f)
+
+class FlatForest:
+    """Read-only Random Forest scorer over memory-mapped arrays written by compile_forest"""
+
+    def __init__(self, path):
+        self.nodes = np.load(os.path.join(path, 'nodes.npy'), mmap_mode='r')
+        self.path_sums = np.load(os.path.join(path, 'path_sums.npy'), mmap_mode='r')
+        self.roots = np.load(os.path.join(path, 'roots.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.bias = meta['bias']
+        self.classes_ = np.array(meta['classes'])
+        self.n_features_in_ = meta['n_features']
+        # Field views over the mapping; no node data is copied into the process
+        self._left = np.asarray(self.nodes['left'])
+        self._right = np.asarray(self.nodes['right'])
+        self._feature = np.asarray(self.nodes['feature'])
+        self._threshold = np.asarray(self.nodes['threshold'])
+        self._fraud_prob = np.asarray(self.nodes['fraud_prob'])
+
+    def warm(self):
+        """Read every mapped page once so forked workers find the image in the page cache"""
+        for array in (self.nodes, self.path_sums, self.roots):
+            np.asarray(array).view(np.uint8).sum()
+
+    def apply(self, X):
+        """Global leaf index reached in every tree, shape (n_samples, n_trees)"""
+        # Same comparison as scikit-learn: float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        index = np.broadcast_to(np.asarray(self.roots), (X.shape[0], len(self.roots))).copy()
+        while True:
+            left = self._left[index]
+            internal = left != -1
+            if not internal.any():
+                return index
+            go_left = X[rows, self._feature[index]] <= self._threshold[index]
+            index = np.where(internal, np.where(go_left, left, self._right[index]), index)
+
+    def predict_proba(self, X):
+        fraud = self._fraud_prob[self.apply(X)].mean(axis=1)
+        return np.column_stack([1 - fraud, fraud]) if self.classes_[1] == 1 else np.column_stack([fraud, 1 - fraud])
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def feature_contributions(self, X):
+        leaves = self.apply(X)
+        contributions = np.zeros((leaves.shape[0], self.path_sums.shape[1]))
+        for t in range(leaves.shape[1]):
+            contributions += self.path_sums[leaves[:, t]]
+        return self.bias, contributions
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """Scores POSTed transactions with the worker's FlatForest"""
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self._send_json(404, {'error': 'not found'})
+            return
+        data = metrics.format_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            single = 'transaction' in payload
+            rows = [payload['transaction']] if single else payload['transactions']
+            df = pd.DataFrame(rows, columns=features)
+            deadline = payload.get('deadline')
+            if deadline is not None:
+                deadline = float(deadline)
+        except (ValueError, KeyError, TypeError) as e:
+            metrics.increment("server_bad_requests_total")
+            self._send_json(400, {'error': f"invalid request: {e}"})
+            return
+
+        # Same rules as the bulk upload: non-numeric, missing, infinite or out-of-range values are rejected
+        df, quarantined = self.server.validate(df)
+        if len(quarantined):
+            metrics.increment("server_bad_requests_total")
+            rejected = [{'row': int(row), 'reason': reason}
+                        for row, reason in zip(quarantined['row'], quarantined['reason'])]
+            self._send_json(400, {'error': "invalid transactions", 'rejected': rejected})
+            return
+
+        try:
+            verdicts = self.server.score(df, deadline)
+            results = [
+                {'prediction': int(p), 'reason': r, 'issues': i, 'degraded': i['degraded']}
+                for p, r, i in zip(verdicts['FraudDetected'], verdicts['FraudReason'], verdicts['FraudIssue'])
+            ]
+        except Exception as e:
+            # Never leave the connection without a reply
+            metrics.increment("server_errors_total")
+            self._send_json(500, {'error': f"scoring failed: {e}"})
+            return
+        self._send_json(200, results[0] if single else {'results': results})
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the cost of a scoring call
+        pass
+
+class ScoringServer(HTTPServer):
+    """
+    HTTPServer holding the shared FlatForest; each forked worker serves from the same socket.
+    `monitor` is the DriftMonitor for the served model, or None when it has no reference.
+    """
+
+    # The default backlog of 5 refuses connections under load before any worker is busy
+    request_queue_size = 1024
+
+    def __init__(self, address, forest, monitor=None):
+        super().__init__(address, ScoringHandler)
+        self.forest = forest
+        self.monitor = monitor
+
+    def validate(self, df):
+        return scoring.validate_transactions(df)
+
+    def score(self, df, deadline=None):
+        if self.monitor is not None:
+            self.monitor.observe(df[features].to_numpy(dtype=float))
+        return scoring.detect_fraud_batch(df, self.forest, deadline)
+
+def _run_worker(server):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Metrics live in each worker's memory; the pid tells scrapers which worker answered
+    metrics.set_gauge("server_worker_pid", os.getpid())
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(1)
+
+def supervise(server, workers, min_uptime=1.0):
+    """Fork `workers` processes serving `server` and restart any that exit until signalled"""
+    children = {}
+    stopping = False
+
+    def spawn(slot):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(server)
+        children[pid] = (slot, time.monotonic())
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"✅ {workers} workers listening on http://{server.server_address[0]}:{server.server_address[1]}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot, started = children.pop(pid, (None, None))
+        if stopping or slot is None:
+            continue
+        # Logged only: the parent serves no /metrics, so a counter here would never be read
+        print(f"⚠️  Worker {slot} (pid {pid}) exited with status {status}; restarting")
+        # Back off when a worker dies right after start so a broken build does not fork-storm
+        if time.monotonic() - started < min_uptime:
+            time.sleep(min_uptime)
+        spawn(slot)
+
+    server.server_close()
+    print("\n👋 Server stopped.")
+
+def model_stamp(model_path):
+    """Absolute path, size and mtime of `model_path`, stored with the image built from it"""
+    stat = os.stat(model_path)
+    return {'path': os.path.abspath(model_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def default_image_path(model_path):
+    """Image directory next to `model_path` (rf_model3.pkl -> rf_model3.forest)"""
+    return os.path.splitext(model_path)[0] + '.forest'
+
+def load_forest(model_path, image_path=None):
+    """Compile `model_path` into `image_path` unless the image was built from this exact file, then map it"""
+    image_path = image_path or default_image_path(model_path)
+    source = model_stamp(model_path)
+    meta = os.path.join(image_path, 'meta.json')
+    built_from = None
+    if os.path.exists(meta):
+        with open(meta) as f:
+            built_from = json.load(f).get('source')
+    if built_from != source:
+        print(f"🔧 Compiling '{model_path}' into '{image_path}'...")
+        compile_forest(joblib.load(model_path), image_path, source)
+    return FlatForest(image_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork scoring server for the fraud model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: one per core)")
+    parser.add_argument('--model', default='rf_model3.pkl', help="trained model to serve")
+    parser.add_argument('--image', help="directory for the compiled, memory-mapped model (default: next to --model)")
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        print("❌ Pre-fork serving needs a platform with os.fork (Linux or macOS).")
+        sys.exit(1)
+
+    forest = load_forest(args.model, args.image)
+    forest.warm()
+
+    # Drift is measured against the served model's own reference histograms
+    server = ScoringServer((args.host, args.port), forest, drift.load_monitor(args.model))
+    # Move everything allocated so far out of the GC's reach so collections in the
+    # workers do not write to (and so copy) the inherited pages
+    gc.freeze()
+    supervise(server, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Cached, parallel hyperparameter search for the fraud detection Random Forest
+
+Cleans and outlier-filters the training data once, caches the feature matrix on
+disk as memory-mapped .npy files, and runs cross-validated searches over a
+parameter grid in parallel across cores. Every candidate is scored on both
+ROC AUC and single-transaction inference latency, timed sequentially after
+the parallel cross-validation. The winner is refit
+on the full data and saved with joblib, in the same format the app loads, to
+rf_model_tuned.pkl; replacing the production rf_model3.pkl needs --overwrite.
+
+Examples:
+    python tune_model.py --data PS_20174392719_1491204439457_log.csv
+    python tune_model.py --synthetic 20000 --max-latency-ms 5
+    python tune_model.py --data PS_20174392719_1491204439457_log.csv --output rf_model3.pkl --overwrite
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+
+import drift
+from create_mock_model import generate_mock_data
+
+# Feature list used in the model
+features = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest', 'isFlaggedFraud']
+target = 'isFraud'
+
+# Bump when the cleaning steps change so stale caches are not reused
+CLEANING_VERSION = 1
+
+# Search space around the hand-picked hyperparameters (45 / 4 / 100 / 30, class_weight="balanced")
+PARAM_GRID = {
+    'n_estimators': [25, 45, 100],
+    'max_depth': [4, 6, 8],
+    'min_samples_split': [50, 100],
+    'min_samples_leaf': [10, 30],
+    'class_weight': [None, 'balanced'],
+}
+
+def clean_transactions(df):
+    """Drop incomplete rows and amount outliers (IQR rule, as on the Visualization page)"""
+    df = df.dropna(subset=features + [target])
+    q1, q3 = df['amount'].quantile([0.25, 0.75])
+    iqr = q3 - q1
+    return df[(df['amount'] >= q1 - 1.5 * iqr) & (df['amount'] <= q3 + 1.5 * iqr)]
+
+def _cache_key(source):
+    stat = os.stat(source)
+    text = f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}|{CLEANING_VERSION}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def _save_atomic(path, array):
+    """np.save to a temporary name and rename, so an interrupted run never leaves a truncated file"""
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        np.save(f, array)
+    os.replace(temp, path)
+
+def load_features(source, cache_dir='.tuning_cache'):
+    """
+    Return (X, y) for the CSV at `source` as read-only memory-maps.
+
+    The cleaned matrix is written once per source file version; later runs, and
+    every parallel worker, map the same files instead of re-parsing the CSV.
+    """
+    path = os.path.join(cache_dir, _cache_key(source))
+    x_path, y_path = os.path.join(path, 'X.npy'), os.path.join(path, 'y.npy')
+
+    if not (os.path.exists(x_path) and os.path.exists(y_path)):
+        print(f"🧹 Cleaning '{source}' (cached in '{path}')...")
+        df = clean_transactions(pd.read_csv(source, usecols=features + [target]))
+        os.makedirs(path, exist_ok=True)
+        # Trees compare float32 features, so store them that way and skip the conversion on every fit
+        # X is written last and its presence marks the cache as complete
+        _save_atomic(y_path, df[target].to_numpy(dtype=np.int8))
+        _save_atomic(x_path, np.ascontiguousarray(df[features].to_numpy(dtype=np.float32)))
+    else:
+        print(f"📦 Using cached features from '{path}'")
+
+    return np.load(x_path, mmap_mode='r'), np.load(y_path, mmap_mode='r')
+
+def measure_latency(model, X, repeats=50):
+    """Median wall time in milliseconds of a single-transaction predict_proba call"""
+    sample = np.asarray(X[:1])
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict_proba(sample)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+def evaluate_fold(params, X, y, train_idx, test_idx, random_state=42, keep_model=False):
+    """Fit one candidate on one fold; returns its AUC, and the fitted model when `keep_model`"""
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    model.fit(X[train_idx], y[train_idx])
+    auc = roc_auc_score(y[test_idx], model.predict_proba(X[test_idx])[:, 1])
+    return auc, model if keep_model else None
+
+def search(X, y, param_grid=PARAM_GRID, folds=3, n_jobs=-1, random_state=42):
+    """Cross-validate every combination in `param_grid` in parallel; one row per candidate"""
+    names = list(param_grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state).split(np.zeros(len(y)), y))
+
+    print(f"🔍 Evaluating {len(candidates)} candidates x {folds} folds...")
+    runs = Parallel(n_jobs=n_jobs, verbose=0)(
+        delayed(evaluate_fold)(params, X, y, train_idx, test_idx, random_state, keep_model=fold == 0)
+        for params in candidates
+        for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+
+    # Latency is timed one candidate at a time once the workers are done, so CPU contention
+    # between parallel fits does not leak into the numbers; each uses its first-fold model
+    print(f"⏱️  Timing {len(candidates)} candidates...")
+    models = [model for _, model in runs if model is not None]
+    sample = X[splits[0][1]]
+
+    # Runs come back in submission order, one row of folds per candidate; aggregating by
+    # position rather than grouping on the parameters keeps class_weight=None rows intact
+    aucs = np.array([auc for auc, _ in runs]).reshape(len(candidates), folds)
+    results = pd.DataFrame(candidates, columns=names).assign(
+        auc=aucs.mean(axis=1),
+        auc_std=aucs.std(axis=1, ddof=1),
+        latency_ms=[measure_latency(model, sample) for model in models],
+    )
+    return results.sort_values(['auc', 'latency_ms'], ascending=[False, True], ignore_index=True)
+
+def _param_value(value):
+    """A grid value from a results row as the plain Python value RandomForestClassifier expects"""
+    if isinstance(value, str):
+        return value
+    if pd.isna(value):
+        return None
+    return int(value)
+
+def pick_winner(results, max_latency_ms=None, auc_tolerance=0.002):
+    """
+    Pick the fastest candidate whose AUC is within `auc_tolerance` of the best one,
+    considering only candidates under `max_latency_ms` when a budget is given.
+    """
+    eligible = results if max_latency_ms is None else results[results['latency_ms'] <= max_latency_ms]
+    if eligible.empty:
+        raise ValueError(f"No candidate meets the {max_latency_ms} ms latency budget")
+    close = eligible[eligible['auc'] >= eligible['auc'].max() - auc_tolerance]
+    return close.sort_values('latency_ms').iloc[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the fraud detection model")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', help=f"training CSV with the model features and '{target}'")
+    source.add_argument('--synthetic', type=int, metavar='N', help="tune on N mock transactions instead")
+    parser.add_argument('--cache-dir', default='.tuning_cache', help="where cleaned feature matrices are cached")
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="parallel workers (-1 = all cores)")
+    parser.add_argument('--max-latency-ms', type=float, help="discard candidates slower than this per transaction")
+    parser.add_argument('--auc-tolerance', type=float, default=0.002, help="AUC given up for a faster model")
+    parser.add_argument('--output', default='rf_model_tuned.pkl', help="where to save the winning model")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="replace --output (and its reference histograms) if it already exists")
+    parser.add_argument('--results', default='tuning_results.csv', help="where to save the results table")
+    args = parser.parse_args()
+
+    # Checked before the search so an hour of tuning is not lost to a refused write
+    if os.path.exists(args.output) and not args.overwrite:
+        parser.error(f"'{args.output}' already exists; pass --overwrite to replace it")
+
+    if args.data:
+        X, y = load_features(args.data, args.cache_dir)
+    else:
+        X, y = generate_mock_data(args.synthetic)
+        X, y = X.astype(np.float32), y.astype(np.int8)
+
+    results = search(X, y, folds=args.folds, n_jobs=args.n_jobs)
+    winner = pick_winner(results, args.max_latency_ms, args.auc_tolerance)
+    params = {name: _param_value(winner[name]) for name in PARAM_GRID}
+    results['selected'] = results.index == winner.name
+
+    print(results.to_string(index=False))
+    results.to_csv(args.results, index=False)
+    print(f"💾 Results saved as '{args.results}'")
+
+    print(f"🏆 Best: {params} (AUC {winner['auc']:.4f}, {winner['latency_ms']:.3f} ms)")
+    rf_model = RandomForestClassifier(random_state=42, **params)
+    rf_model.fit(np.asarray(X), np.asarray(y))
+    joblib.dump(rf_model, args.output)
+    print(f"💾 Model saved as '{args.output}'")
+
+    drift.save_reference(drift.build_reference(X), drift.reference_path(args.output))
+    print(f"💾 Reference histograms saved as '{drift.reference_path(args.output)}'")
+
+if __name__ == "__main__":
+    main()